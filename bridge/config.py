@@ -5,34 +5,105 @@ All settings are read from environment variables (loaded from .env.local
 for local development). No secrets are embedded in source.
 """
 
+import functools
 import os
 import re
 import textwrap
+from typing import Optional
 
 from dotenv import load_dotenv
 
 
+_PEM_BEGIN_RE = re.compile(r"-----BEGIN [A-Z ]+-----")
+_PEM_END_RE = re.compile(r"-----END [A-Z ]+-----")
+_PEM_HEADER_RES = (
+    re.compile(r"Proc-Type: [^\n]+"),
+    re.compile(r"DEK-Info: [^\n]+"),
+)
+_WHITESPACE_RE = re.compile(r"\s+")
+
+_PROJECT_ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+_env_path: Optional[str] = None
+
+
 def load_env():
-    """Load environment from .env.local (preferred) or .env, searching upward."""
+    """Load environment from .env.local (preferred) or .env, searching upward.
+
+    The winning path is remembered, so later calls return it without
+    touching the filesystem again.
+    """
+    global _env_path
+    if _env_path is not None:
+        return _env_path
+
+    cwd = os.getcwd()
     candidates = [
-        os.path.join(os.getcwd(), ".env.local"),
-        os.path.join(os.getcwd(), ".env"),
-        os.path.join(os.path.dirname(__file__), "..", ".env.local"),
-        os.path.join(os.path.dirname(__file__), "..", ".env"),
+        os.path.join(cwd, ".env.local"),
+        os.path.join(cwd, ".env"),
+        os.path.join(_PROJECT_ROOT, ".env.local"),
+        os.path.join(_PROJECT_ROOT, ".env"),
     ]
     for path in candidates:
-        if os.path.exists(path):
+        if os.path.isfile(path):
             load_dotenv(path)
-            return path
-    return None
+            _env_path = path
+            break
+    _clear_config_cache()
+    return _env_path
+
+
+def invalidate_env_cache():
+    """Forget the loaded .env path so the next load_env() searches again."""
+    global _env_path
+    _env_path = None
+    _clear_config_cache()
 
 
+@functools.lru_cache(maxsize=8)
 def parse_key(key_input: str) -> str:
     """Parse OCI private key from single-line or multi-line PEM format."""
     normalized = (key_input or "").replace("\\n", "\n").strip()
 
-    begin_match = re.search(r"-----BEGIN [A-Z ]+-----", normalized)
-    end_match = re.search(r"-----END [A-Z ]+-----", normalized)
+    # Fast path: one pass over a conventionally line-broken PEM
+    begin_line = end_line = None
+    proc_type = dek_info = None
+    body = []
+    for line in normalized.splitlines():
+        line = line.strip()
+        if begin_line is None:
+            if line.startswith("-----BEGIN ") and line.endswith("-----"):
+                begin_line = line
+        elif line.startswith("-----END ") and line.endswith("-----"):
+            end_line = line
+            break
+        elif line.startswith("Proc-Type:"):
+            proc_type = line
+        elif line.startswith("DEK-Info:"):
+            dek_info = line
+        else:
+            body.append(line)
+
+    if begin_line is None or end_line is None:
+        # Single-line or otherwise irregular input
+        return _parse_key_inline(normalized)
+
+    body_compact = "".join("".join(body).split())
+    parts = [begin_line]
+    parts.extend(h for h in (proc_type, dek_info) if h)
+    parts.append(
+        "\n".join(
+            body_compact[i:i + 64] for i in range(0, len(body_compact), 64)
+        )
+    )
+    parts.append(end_line)
+    return "\n".join(parts)
+
+
+def _parse_key_inline(normalized: str) -> str:
+    """Regex-based PEM parser for keys whose markers share a line with the body."""
+    begin_match = _PEM_BEGIN_RE.search(normalized)
+    end_match = _PEM_END_RE.search(normalized)
     if not begin_match or not end_match:
         raise ValueError("PEM BEGIN/END markers not found in key_content")
 
@@ -42,13 +113,13 @@ def parse_key(key_input: str) -> str:
 
     # Preserve encryption headers if present
     encr_lines = ""
-    for pattern in (r"Proc-Type: [^\n]+", r"DEK-Info: [^\n]+"):
-        m = re.search(pattern, key_block)
+    for pattern in _PEM_HEADER_RES:
+        m = pattern.search(key_block)
         if m:
             encr_lines += m.group().strip() + "\n"
             key_block = key_block.replace(m.group(), "")
 
-    body_compact = re.sub(r"\s+", "", key_block)
+    body_compact = _WHITESPACE_RE.sub("", key_block)
     wrapped_body = "\n".join(textwrap.wrap(body_compact, 64))
 
     parts = [begin_line]
@@ -65,19 +136,22 @@ def mask(value: str, keep: int = 6) -> str:
         return ""
     if len(value) <= keep:
         return "***"
-    return f"{value[:keep]}...***"
+    return value[:keep] + "...***"
 
 
 # ── GCP settings ──────────────────────────────────────────────
 
+@functools.lru_cache(maxsize=1)
 def gcp_project_id() -> str:
     return os.environ["GCP_PROJECT_ID"]
 
 
+@functools.lru_cache(maxsize=1)
 def gcp_subscription() -> str:
     return os.environ["GCP_PUBSUB_SUBSCRIPTION"]
 
 
+@functools.lru_cache(maxsize=1)
 def gcp_topic() -> str:
     return os.environ.get("GCP_PUBSUB_TOPIC", "oci-log-export-topic")
 
@@ -114,10 +188,12 @@ def oci_config() -> dict:
     }
 
 
+@functools.lru_cache(maxsize=1)
 def oci_message_endpoint() -> str:
     return os.environ["OCI_MESSAGE_ENDPOINT"]
 
 
+@functools.lru_cache(maxsize=1)
 def oci_stream_ocid() -> str:
     ocid = os.environ["OCI_STREAM_OCID"]
     if "streampool" in ocid:
@@ -128,21 +204,50 @@ def oci_stream_ocid() -> str:
     return ocid
 
 
+@functools.lru_cache(maxsize=1)
 def max_batch_size() -> int:
     return int(os.environ.get("MAX_BATCH_SIZE", 100))
 
 
+@functools.lru_cache(maxsize=1)
 def max_batch_bytes() -> int:
     return int(os.environ.get("MAX_BATCH_BYTES", 1024 * 1024))
 
 
+@functools.lru_cache(maxsize=1)
 def ack_deadline_seconds() -> int:
     return int(os.environ.get("ACK_DEADLINE_SECONDS", 60))
 
 
+@functools.lru_cache(maxsize=1)
 def pull_max_messages() -> int:
     return int(os.environ.get("PULL_MAX_MESSAGES", 1000))
 
 
+@functools.lru_cache(maxsize=1)
 def inactivity_timeout() -> int:
     return int(os.environ.get("INACTIVITY_TIMEOUT", 30))
+
+
+@functools.lru_cache(maxsize=1)
+def enrich_strict() -> bool:
+    """Whether to JSON-validate payloads before tagging them."""
+    return os.environ.get("GCP_ENRICH_STRICT", "0") == "1"
+
+
+def _clear_config_cache():
+    """Drop cached settings so the next read reflects the current environment."""
+    for accessor in (
+        gcp_project_id,
+        gcp_subscription,
+        gcp_topic,
+        oci_message_endpoint,
+        oci_stream_ocid,
+        max_batch_size,
+        max_batch_bytes,
+        ack_deadline_seconds,
+        pull_max_messages,
+        inactivity_timeout,
+        enrich_strict,
+    ):
+        accessor.cache_clear()
@@ -0,0 +1,41 @@
+"""
+Per-message enrichment applied before forwarding to OCI Streaming.
+
+Kept in its own module, free of SDK imports and fully typed, so the hot
+per-message path can be profiled (or compiled, e.g. with mypyc) in
+isolation from the subscriber.
+"""
+
+import json
+import re
+
+_CSP_KEY = b'"cloudProvider"'
+_CSP_TAG = b'{"cloudProvider":"GCP",'
+_CSP_ONLY = b'{"cloudProvider":"GCP"}'
+_EMPTY_OBJECT = re.compile(rb"\{\s*\}\Z")
+
+
+def enrich(data: bytes, strict: bool = False) -> bytes:
+    """Inject cloud-provider tag so multicloud dashboards can filter by CSP.
+
+    Log Router exports are always JSON objects, so a payload shaped like
+    one is tagged by splicing the field in after the opening brace,
+    without decoding it. Anything else is passed through unchanged.
+    With *strict*, the payload is JSON-validated before tagging. Payloads
+    that already carry a cloudProvider key are decoded so the existing
+    value is overwritten rather than duplicated.
+    """
+    obj = data.strip()
+    if obj[:1] != b"{" or obj[-1:] != b"}":
+        return data
+    if strict or _CSP_KEY in obj:
+        try:
+            parsed = json.loads(obj)
+        except ValueError:
+            return data
+        if "cloudProvider" in parsed:
+            parsed["cloudProvider"] = "GCP"
+            return json.dumps(parsed, separators=(",", ":")).encode("utf-8")
+    if _EMPTY_OBJECT.match(obj):
+        return _CSP_ONLY
+    return _CSP_TAG + obj[1:]
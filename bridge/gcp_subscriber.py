@@ -5,15 +5,17 @@ Uses the google-cloud-pubsub streaming-pull API to receive messages
 asynchronously and forward them to OCI Streaming via *MessageBuffer*.
 """
 
-import json
+import itertools
 import logging
-import threading
 import time
+from concurrent import futures
 
 from google.cloud import pubsub_v1
+from google.cloud.pubsub_v1.subscriber.scheduler import ThreadScheduler
 
 from bridge.config import (
     ack_deadline_seconds,
+    enrich_strict,
     gcp_project_id,
     gcp_subscription,
     inactivity_timeout,
@@ -23,11 +25,24 @@ from bridge.config import (
     oci_config,
     oci_message_endpoint,
     oci_stream_ocid,
+    pull_max_messages,
 )
-from bridge.oci_stream_sender import MessageBuffer, OciStreamSender
+from bridge.enrich import enrich
+from bridge.oci_stream_sender import SEND_WORKERS, MessageBuffer, OciStreamSender
 
 logger = logging.getLogger(__name__)
 
+# Callback threads; enough that a callback blocked on an OCI flush does
+# not stall delivery to the others.
+CALLBACK_WORKERS = 32
+
+# How often buffered (still unacked) messages are flushed to OCI
+FLUSH_INTERVAL_SECONDS = 5
+
+# Upper bound on unacked message bytes held in memory (google-cloud-pubsub's
+# own default)
+FLOW_CONTROL_MAX_BYTES = 100 * 1024 * 1024
+
 
 class PubSubBridge:
     """Subscribe to GCP Pub/Sub and forward messages to OCI Streaming."""
@@ -38,6 +53,8 @@ class PubSubBridge:
         endpoint = oci_message_endpoint()
         stream_ocid = oci_stream_ocid()
         self.sender = OciStreamSender(cfg, endpoint, stream_ocid)
+        self._endpoint_masked = mask(endpoint)
+        self._stream_masked = mask(stream_ocid)
         self.buffer = MessageBuffer(
             self.sender,
             max_count=max_batch_size(),
@@ -51,68 +68,63 @@ class PubSubBridge:
             f"projects/{self.project_id}/subscriptions/{self.subscription_id}"
         )
 
-        # Counters
+        # Counters: next() on itertools.count is atomic under the GIL, so
+        # callback threads can bump them without taking a lock. The value
+        # drawn is stored for reading; when two stores race it may trail the
+        # true count by the number of callbacks running at that moment.
+        self._processed_counter = itertools.count(1)
+        self._errors_counter = itertools.count(1)
         self.processed = 0
         self.errors = 0
-        self._lock = threading.Lock()
-        self._last_message_time = time.time()
+        self._last_message_ns = time.monotonic_ns()
         self._timeout = inactivity_timeout()
+        self._enrich_strict = enrich_strict()
 
         logger.info(
             "Bridge initialised | project=%s | subscription=%s | "
             "endpoint=%s | stream=%s",
             self.project_id,
             self.subscription_id,
-            mask(endpoint),
-            mask(stream_ocid),
+            self._endpoint_masked,
+            self._stream_masked,
         )
 
     # ── callback ──────────────────────────────────────────────
 
-    @staticmethod
-    def _enrich(body: str) -> str:
-        """Inject cloud-provider tag so multicloud dashboards can filter by CSP."""
-        try:
-            obj = json.loads(body)
-            obj["cloudProvider"] = "GCP"
-            return json.dumps(obj, separators=(",", ":"))
-        except (json.JSONDecodeError, TypeError):
-            return body
-
     def _callback(self, message: pubsub_v1.subscriber.message.Message):
         """Handle a single Pub/Sub message."""
         try:
-            body = message.data.decode("utf-8")
-            if not body or body.isspace():
+            data = message.data
+            if not data or data.isspace():
                 logger.warning("Empty Pub/Sub message, skipping")
                 message.ack()
                 return
-
-            self.buffer.add(self._enrich(body))
-            message.ack()
-
-            with self._lock:
-                self.processed += 1
-                self._last_message_time = time.time()
-
-            if self.processed % 500 == 0:
-                logger.info(
-                    "Progress: processed=%d, sent=%d, failed=%d",
-                    self.processed,
-                    self.buffer.sent,
-                    self.buffer.failed,
-                )
-
-        except UnicodeDecodeError as exc:
-            logger.error("Failed to decode message as UTF-8: %s", exc)
-            message.nack()
-            with self._lock:
-                self.errors += 1
+            payload = enrich(data, self._enrich_strict)
         except Exception as exc:
             logger.error("Error processing message: %s", exc)
             message.nack()
-            with self._lock:
-                self.errors += 1
+            self.errors = next(self._errors_counter)
+            return
+
+        self._last_message_ns = time.monotonic_ns()
+
+        try:
+            # The buffer acks the message once its batch is accepted by OCI
+            # (or nacks it for redelivery), so it is not acked here.
+            self.buffer.add(payload, message)
+        except Exception as exc:
+            logger.error("Error sending to OCI: %s", exc)
+            self.errors = next(self._errors_counter)
+            return
+
+        processed = self.processed = next(self._processed_counter)
+        if processed % 500 == 0:
+            logger.info(
+                "Progress: processed=%d, sent=%d, failed=%d",
+                processed,
+                self.buffer.sent,
+                self.buffer.failed,
+            )
 
     # ── run ───────────────────────────────────────────────────
 
@@ -125,15 +137,23 @@ class PubSubBridge:
         """
         subscriber = pubsub_v1.SubscriberClient()
 
+        # Messages stay outstanding until their batch is accepted by OCI, so
+        # the byte limit covers the batches that can be in flight plus the
+        # one being buffered, keeping sends overlapping with delivery.
         flow_control = pubsub_v1.types.FlowControl(
-            max_messages=max_batch_size(),
-            max_bytes=max_batch_bytes(),
+            max_messages=pull_max_messages(),
+            max_bytes=min(
+                max_batch_bytes() * (SEND_WORKERS + 1), FLOW_CONTROL_MAX_BYTES
+            ),
         )
 
         streaming_pull = subscriber.subscribe(
             self.subscription_path,
             callback=self._callback,
             flow_control=flow_control,
+            scheduler=ThreadScheduler(
+                executor=futures.ThreadPoolExecutor(max_workers=CALLBACK_WORKERS)
+            ),
             await_callbacks_on_shutdown=True,
         )
 
@@ -144,15 +164,25 @@ class PubSubBridge:
         )
 
         try:
-            if run_forever:
-                streaming_pull.result()
-            else:
+            timeout_ns = self._timeout * 1_000_000_000
+            while True:
+                try:
+                    streaming_pull.result(timeout=FLUSH_INTERVAL_SECONDS)
+                    break
+                except futures.TimeoutError:
+                    pass
+
+                # Buffered messages stay unacked until sent, so flush on a
+                # timer as well as on the size thresholds.
+                try:
+                    self.buffer.flush()
+                except Exception as exc:
+                    logger.error("Periodic flush to OCI failed: %s", exc)
+
                 # Drain mode: stop when idle for INACTIVITY_TIMEOUT seconds
-                while True:
-                    time.sleep(5)
-                    with self._lock:
-                        idle = time.time() - self._last_message_time
-                    if idle >= self._timeout:
+                if not run_forever:
+                    idle_ns = time.monotonic_ns() - self._last_message_ns
+                    if idle_ns >= timeout_ns:
                         logger.info(
                             "Inactivity timeout (%ds) reached, stopping",
                             self._timeout,
@@ -161,11 +191,22 @@ class PubSubBridge:
         except KeyboardInterrupt:
             logger.info("Keyboard interrupt received")
         finally:
+            # Final flush while the stream is still open, so the resulting
+            # acks reach Pub/Sub; once cancelled they would be dropped.
+            try:
+                self.buffer.flush()
+            except Exception as exc:
+                logger.error("Final flush to OCI failed: %s", exc)
+
+            # Messages arriving from here on could be sent but never acked,
+            # so they are nacked for redelivery instead of sent to OCI twice.
+            dropped = self.buffer.close()
+            if dropped:
+                logger.info("Left %d buffered messages for redelivery", dropped)
+
             streaming_pull.cancel()
             streaming_pull.result(timeout=10)
-
-            # Final flush
-            self.buffer.flush()
+            self.sender.close()
 
             logger.info(
                 "Bridge stopped | processed=%d | sent=%d | failed=%d | "
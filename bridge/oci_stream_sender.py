@@ -6,88 +6,295 @@ of JSON strings to an OCI Stream using the PutMessages API, respecting
 the 1 MB / 100-message limits imposed by the service.
 """
 
+import binascii
 import logging
-from base64 import b64encode
-from typing import List, Tuple
-
-import oci
-from oci.streaming.models import PutMessagesDetails, PutMessagesDetailsEntry
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, List, Optional, Tuple, Union
+from urllib.parse import quote
 
 logger = logging.getLogger(__name__)
 
+# Per-entry JSON envelope overhead used when estimating batch size
+ENTRY_OVERHEAD = 50
+
+# Keep-alive connections held open to the stream's message endpoint
+HTTP_POOL_MAXSIZE = 32
+
+# Concurrent PutMessages requests per flush
+SEND_WORKERS = 4
+
+# (tenancy, fingerprint) pairs whose config has already been validated
+_validated_configs = set()
+
+
+class BatchSendError(Exception):
+    """A batch failed to send; carries the totals of the whole send."""
+
+    def __init__(self, sent: int, failed: int, batches: int):
+        super().__init__(
+            f"batch send failed (sent={sent}, failed={failed}, batches={batches})"
+        )
+        self.sent = sent
+        self.failed = failed
+        self.batches = batches
+
 
 class OciStreamSender:
-    """Send string payloads to OCI Streaming with automatic batching."""
+    """Send str/bytes payloads to OCI Streaming with automatic batching."""
 
     def __init__(self, config: dict, message_endpoint: str, stream_ocid: str):
-        oci.config.validate_config(config)
+        # Imported lazily: the SDK is large and only needed once a sender
+        # is actually built.
+        import oci
+
+        identity = (config.get("tenancy"), config.get("fingerprint"))
+        if identity not in _validated_configs:
+            oci.config.validate_config(config)
+            _validated_configs.add(identity)
+        # StreamClient does not retry by default; throttling (429) and 5xx
+        # responses to PutMessages are retried with the SDK's default policy.
         self.client = oci.streaming.StreamClient(
-            config, service_endpoint=message_endpoint
+            config,
+            service_endpoint=message_endpoint,
+            retry_strategy=oci.retry.DEFAULT_RETRY_STRATEGY,
         )
         self.stream_ocid = stream_ocid
+        self._base_client = self.client.base_client
+        self._configure_connection_pool()
+
+        # PutMessages has a fixed schema, so requests are serialised here and
+        # handed straight to the base client instead of going through the
+        # SDK's model objects and reflective serialisation.
+        self._put_path = f"/streams/{quote(stream_ocid, safe='')}/messages"
+        self._retry_strategy = self._base_client.get_preferred_retry_strategy(
+            operation_retry_strategy=None,
+            client_retry_strategy=self.client.retry_strategy,
+        )
+        self._put_headers = {
+            "accept": "application/json",
+            "content-type": "application/json",
+        }
+        self._retrying = bool(self._retry_strategy) and not isinstance(
+            self._retry_strategy, oci.retry.NoneRetryStrategy
+        )
+        if self._retrying:
+            self._base_client.add_opc_client_retries_header(self._put_headers)
+
+        # Batches from one flush are sent concurrently; the semaphore caps
+        # how many are queued or in flight at once.
+        self._pool = ThreadPoolExecutor(
+            max_workers=SEND_WORKERS, thread_name_prefix="oci-send"
+        )
+        self._inflight = threading.Semaphore(SEND_WORKERS)
+
+    def _configure_connection_pool(self):
+        """Re-mount the client's HTTPS adapter with a larger keep-alive pool.
+
+        The session's default adapter is the HTTPAdapter from the SDK's
+        vendored requests; a new instance of that class is mounted so the
+        vendored package need not be imported here.
+        """
+        session = self._base_client.session
+        adapter_cls = type(session.get_adapter("https://"))
+        session.mount(
+            "https://",
+            adapter_cls(pool_connections=1, pool_maxsize=HTTP_POOL_MAXSIZE),
+        )
 
     # ── helpers ────────────────────────────────────────────────
 
     @staticmethod
-    def estimate_batch_bytes(messages: List[str]) -> int:
-        """Estimate wire size of a batch (base64 payload + envelope overhead)."""
-        return (
-            sum(len(b64encode(m.encode("utf-8"))) for m in messages)
-            + len(messages) * 50
-        )
+    def encode(payload: Union[str, bytes]) -> bytes:
+        """Base64-encode a payload as it will appear on the wire."""
+        if isinstance(payload, str):
+            payload = payload.encode("utf-8")
+        return binascii.b2a_base64(payload, newline=False)
+
+    @staticmethod
+    def estimate_batch_bytes(messages: List[Union[str, bytes]]) -> int:
+        """Estimate wire size of a batch (base64 payload + envelope overhead).
+
+        Base64 output length is exactly 4 * ceil(n / 3), so nothing is
+        actually encoded.
+        """
+        total = 0
+        for m in messages:
+            if isinstance(m, str):
+                m = m.encode("utf-8")
+            total += (len(m) + 2) // 3 * 4
+        return total + len(messages) * ENTRY_OVERHEAD
 
     # ── sending ───────────────────────────────────────────────
 
-    def send_batch(self, payloads: List[str]) -> Tuple[int, int]:
+    def send_batch(self, payloads: List[Union[str, bytes]]) -> Tuple[int, int]:
         """Send a single batch, return (sent, failed)."""
-        if not payloads:
-            return (0, 0)
-        entries = [
-            PutMessagesDetailsEntry(
-                value=b64encode(p.encode("utf-8")).decode("utf-8")
-            )
-            for p in payloads
-        ]
-        resp = self.client.put_messages(
-            self.stream_ocid, PutMessagesDetails(messages=entries)
-        )
-        sent = failed = 0
+        return self.send_encoded_batch([self.encode(p) for p in payloads])
+
+    def send_encoded_batch(self, values: List[bytes]) -> Tuple[int, int]:
+        """Send a single batch of already base64-encoded values."""
+        return self._send_and_settle(values, None)
+
+    def _put_batch(self, values: List[bytes]) -> List[bool]:
+        """Send one batch and return a per-entry success flag."""
+        if not values:
+            return []
+        # Base64 values need no JSON escaping, so the body is assembled
+        # byte-for-byte rather than via intermediate dicts and json.dumps.
+        body = bytearray(b'{"messages":[')
+        for i, v in enumerate(values):
+            if i:
+                body += b","
+            body += b'{"value":"'
+            body += v
+            body += b'"}'
+        body += b"]}"
+        resp = self._put_messages(bytes(body))
+        results = []
         for entry in resp.data.entries or []:
             if getattr(entry, "error", None):
-                failed += 1
+                results.append(False)
                 logger.warning("OCI put_messages entry error: %s", entry.error)
             else:
-                sent += 1
-        return (sent, failed)
+                results.append(True)
+        return results
+
+    def _send_and_settle(
+        self, values: List[bytes], messages: Optional[List[Any]]
+    ) -> Tuple[int, int]:
+        """Send one batch, then ack/nack the source message of each entry."""
+        try:
+            results = self._put_batch(values)
+        except Exception:
+            for m in messages or ():
+                if m is not None:
+                    m.nack()
+            raise
+        for i, m in enumerate(messages or ()):
+            if m is None:
+                continue
+            if i < len(results) and results[i]:
+                m.ack()
+            else:
+                m.nack()
+        sent = sum(results)
+        return (sent, len(results) - sent)
+
+    def _put_messages(self, body: bytes):
+        """POST a pre-serialised PutMessages body to the stream.
+
+        Mirrors StreamClient.put_messages apart from body serialisation, so
+        retries, circuit breaking and error context behave the same.
+        """
+        kwargs = dict(
+            resource_path=self._put_path,
+            method="POST",
+            header_params=dict(self._put_headers),
+            body=body,
+            response_type="PutMessagesResult",
+            enforce_content_headers=False,
+            operation_name="put_messages",
+            api_reference_link=(
+                "https://docs.oracle.com/iaas/api/#/en/streaming/20180418/"
+                "Message/PutMessages"
+            ),
+            required_arguments=["streamId"],
+        )
+        if self._retrying:
+            self._retry_strategy.add_circuit_breaker_callback(
+                self.client.circuit_breaker_callback
+            )
+        if self._retry_strategy:
+            return self._retry_strategy.make_retrying_call(
+                self._base_client.call_api, **kwargs
+            )
+        return self._base_client.call_api(**kwargs)
 
     def send_with_limits(
         self,
-        payloads: List[str],
+        payloads: List[Union[str, bytes]],
         max_bytes: int,
         max_count: int,
     ) -> Tuple[int, int, int]:
         """Split *payloads* into batches that respect *max_bytes* / *max_count*."""
-        total_sent = total_failed = batches = 0
-        batch: List[str] = []
-        for p in payloads:
-            candidate = batch + [p]
-            if (
-                len(candidate) > max_count
-                or self.estimate_batch_bytes(candidate) > max_bytes
+        return self.send_encoded_with_limits(
+            [self.encode(p) for p in payloads], max_bytes, max_count
+        )
+
+    def send_encoded_with_limits(
+        self,
+        values: List[bytes],
+        max_bytes: int,
+        max_count: int,
+        messages: Optional[List[Any]] = None,
+    ) -> Tuple[int, int, int]:
+        """Like *send_with_limits*, for already base64-encoded values.
+
+        Batch size is tracked as a running sum, so each value is measured
+        exactly once. If *messages* is given (parallel to *values*, entries
+        may be None), each one is acked once its value is accepted by OCI
+        and nacked otherwise. If any batch fails, BatchSendError is raised
+        once all batches have finished, carrying the totals of the send.
+        """
+        bounds: List[Tuple[int, int]] = []
+        start = batch_bytes = 0
+        for i, v in enumerate(values):
+            size = len(v) + ENTRY_OVERHEAD
+            if i > start and (
+                i - start >= max_count or batch_bytes + size > max_bytes
             ):
-                s, f = self.send_batch(batch)
+                bounds.append((start, i))
+                start = i
+                batch_bytes = 0
+            batch_bytes += size
+        if start < len(values):
+            bounds.append((start, len(values)))
+
+        futures = []
+        error = None
+        for start, end in bounds:
+            self._inflight.acquire()
+            try:
+                future = self._pool.submit(
+                    self._send_and_settle,
+                    values[start:end],
+                    messages[start:end] if messages is not None else None,
+                )
+            except Exception as exc:
+                # e.g. the pool has been shut down; nothing will release
+                # this slot, so give it back here.
+                self._inflight.release()
+                error = exc
+                break
+            future.add_done_callback(lambda _: self._inflight.release())
+            futures.append(future)
+        wait(futures)
+
+        # Batches that completed have already settled their messages, so
+        # every batch is totalled before any error is raised.
+        total_sent = total_failed = 0
+        for (start, end), future in zip(bounds, futures):
+            exc = future.exception()
+            if exc is None:
+                s, f = future.result()
                 total_sent += s
                 total_failed += f
-                batches += 1
-                batch = [p]
             else:
-                batch = candidate
-        if batch:
-            s, f = self.send_batch(batch)
-            total_sent += s
-            total_failed += f
-            batches += 1
-        return (total_sent, total_failed, batches)
+                total_failed += end - start
+                error = error or exc
+        if len(futures) < len(bounds):
+            unsent = bounds[len(futures)][0]
+            total_failed += len(values) - unsent
+            for m in (messages or [])[unsent:]:
+                if m is not None:
+                    m.nack()
+        if error is not None:
+            raise BatchSendError(total_sent, total_failed, len(futures)) from error
+        return (total_sent, total_failed, len(bounds))
+
+    def close(self):
+        """Wait for in-flight sends and release the worker threads."""
+        self._pool.shutdown(wait=True)
 
 
 class MessageBuffer:
@@ -102,31 +309,83 @@ class MessageBuffer:
         self.sender = sender
         self.max_count = max_count
         self.max_bytes = max_bytes
-        self.buf: List[str] = []
+        self.buf: List[Tuple[Optional[Any], bytes]] = []
+        self._bytes_est = 0
+        self._lock = threading.Lock()
+        self._closed = False
         self.sent = 0
         self.failed = 0
         self.batches = 0
 
-    def add(self, payload: str):
-        self.buf.append(payload)
-        self._flush_if_needed()
+    def add(self, payload: Union[str, bytes], message: Optional[Any] = None):
+        """Buffer *payload* for sending.
+
+        *message*, if given, is acked once the payload has been accepted by
+        OCI and nacked if sending fails, giving at-least-once delivery.
+        """
+        # Encode once on insert and keep a running size estimate, so the
+        # threshold check does not re-encode the whole buffer per message.
+        encoded = OciStreamSender.encode(payload)
+        with self._lock:
+            if self._closed:
+                if message is not None:
+                    message.nack()
+                return
+            self.buf.append((message, encoded))
+            self._bytes_est += len(encoded) + ENTRY_OVERHEAD
+            pending = self._take_if_needed()
+        if pending:
+            self._send(pending)
 
-    def _flush_if_needed(self, force: bool = False):
+    def _take_if_needed(self, force: bool = False):
+        """Detach the buffer contents if a threshold is hit. Caller holds the lock."""
         if not self.buf:
-            return
+            return None
         if (
             force
             or len(self.buf) >= self.max_count
-            or OciStreamSender.estimate_batch_bytes(self.buf) >= self.max_bytes
+            or self._bytes_est >= self.max_bytes
         ):
-            s, f, b = self.sender.send_with_limits(
-                self.buf, self.max_bytes, self.max_count
+            pending, self.buf = self.buf, []
+            self._bytes_est = 0
+            return pending
+        return None
+
+    def _send(self, pending: List[Tuple[Optional[Any], bytes]]):
+        try:
+            s, f, b = self.sender.send_encoded_with_limits(
+                [encoded for _, encoded in pending],
+                self.max_bytes,
+                self.max_count,
+                messages=[message for message, _ in pending],
             )
-            self.sent += s
-            self.failed += f
-            self.batches += b
-            self.buf.clear()
-            logger.info("Flushed to OCI: sent=%d, failed=%d, batches=%d", s, f, b)
+        except BatchSendError as exc:
+            self._record(exc.sent, exc.failed, exc.batches)
+            raise
+        self._record(s, f, b)
+        logger.info("Flushed to OCI: sent=%d, failed=%d, batches=%d", s, f, b)
+
+    def _record(self, sent: int, failed: int, batches: int):
+        with self._lock:
+            self.sent += sent
+            self.failed += failed
+            self.batches += batches
 
     def flush(self):
-        self._flush_if_needed(force=True)
+        with self._lock:
+            pending = self._take_if_needed(force=True)
+        if pending:
+            self._send(pending)
+
+    def close(self) -> int:
+        """Stop sending: nack the buffered messages and any added later.
+
+        Returns the number of buffered payloads dropped.
+        """
+        with self._lock:
+            self._closed = True
+            pending = self._take_if_needed(force=True) or []
+        for message, _ in pending:
+            if message is not None:
+                message.nack()
+        return len(pending)
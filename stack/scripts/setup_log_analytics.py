@@ -22,41 +22,64 @@
 #   OCI_REGION, OCI_USER_OCID, OCI_FINGERPRINT,
 #   OCI_TENANCY_OCID, OCI_KEY_FILE or OCI_KEY_CONTENT
 #
+# Optional tuning:
+#   LA_FIELD_WORKERS    – field upsert threads (default 16)
+#   LA_MAX_INFLIGHT     – max concurrent upserts (default 8)
+#
 # Usage:
 #   export LA_NAMESPACE="mynamespace"
 #   export OCI_COMPARTMENT_ID="ocid1.compartment.oc1..xxx"
 #   python3 stack/scripts/setup_log_analytics.py
 # ─────────────────────────────────────────────────────────────
+import functools
 import json
 import os
+import random
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import oci
 from oci.log_analytics.models import (
     LogAnalyticsField,
+    LogAnalyticsParser,
     LogAnalyticsParserField,
+    LogAnalyticsSourceEntityType,
     UpsertLogAnalyticsFieldDetails,
     UpsertLogAnalyticsParserDetails,
+    UpsertLogAnalyticsSourceDetails,
 )
 
 
 # ── Authentication ────────────────────────────────────────────
 
+# Keep-alive connections to the Log Analytics endpoint, shared by all calls
+HTTP_POOL_MAXSIZE = 32
+
+
+@functools.lru_cache(maxsize=1)
 def get_client():
-    """Build LogAnalyticsClient with auto-detected auth."""
+    """Build LogAnalyticsClient with auto-detected auth.
+
+    Cached, so repeat callers share one client and its connection pool, and
+    credentials are only loaded once.
+    """
 
     # 1. Resource Principal (OCI Resource Manager / Container Instances)
     if os.environ.get("OCI_RESOURCE_PRINCIPAL_VERSION"):
         signer = oci.auth.signers.get_resource_principals_signer()
-        return oci.log_analytics.LogAnalyticsClient({}, signer=signer)
+        return _pooled(oci.log_analytics.LogAnalyticsClient({}, signer=signer))
 
     # 2. OCI config file (~/.oci/config)
     try:
         config = oci.config.from_file()
         oci.config.validate_config(config)
-        return oci.log_analytics.LogAnalyticsClient(config)
+        client = oci.log_analytics.LogAnalyticsClient(config)
     except Exception:
-        pass
+        client = None
+    if client is not None:
+        return _pooled(client)
 
     # 3. Environment variables
     key_file = os.environ.get("OCI_KEY_FILE")
@@ -80,7 +103,22 @@ def get_client():
         "tenancy": os.environ["OCI_TENANCY_OCID"],
         "region": os.environ.get("OCI_REGION", ""),
     }
-    return oci.log_analytics.LogAnalyticsClient(config)
+    return _pooled(oci.log_analytics.LogAnalyticsClient(config))
+
+
+def _pooled(client):
+    """Give the client a keep-alive pool large enough for concurrent calls.
+
+    The session's default adapter is the HTTPAdapter from the SDK's
+    vendored requests; a new instance of that class is mounted with a
+    larger pool.
+    """
+    session = client.base_client.session
+    adapter_cls = type(session.get_adapter("https://"))
+    session.mount(
+        "https://", adapter_cls(pool_connections=1, pool_maxsize=HTTP_POOL_MAXSIZE)
+    )
+    return client
 
 
 # ── Field Definitions (40 custom fields) ─────────────────────
@@ -141,7 +179,7 @@ FIELD_DISPLAY_NAMES = [
 # ── Parser Field Mappings (44 total) ─────────────────────────
 # (display_name_or_builtin, json_path, sequence)
 
-FIELD_MAPPINGS = [
+FIELD_MAPPINGS = (
     # Built-in LA fields
     ("msg",                      "$.jsonPayload.message",                                         1),
     ("sevlvl",                   "$.severity",                                                    2),
@@ -196,7 +234,26 @@ FIELD_MAPPINGS = [
     ("GCP Sink Destination",     "$.resource.labels.destination",                                43),
     # Labels
     ("GCP Label Instance ID",    "$.labels.instanceId",                                          44),
-]
+)
+
+# Column-wise views of FIELD_MAPPINGS, iterated in parallel by the parser builder
+_NAMES, _PATHS, _SEQS = zip(*FIELD_MAPPINGS)
+
+# Built-in LA fields are never renamed by field_map, so their parser
+# mappings are built once at import.
+BUILTIN_FIELDS = frozenset({"msg", "sevlvl", "time", "method"})
+
+_STATIC_FIELDS = tuple(
+    LogAnalyticsParserField(
+        field=LogAnalyticsField(name=name),
+        parser_field_name=name,
+        parser_field_sequence=seq,
+        storage_field_name=name,
+        structured_column_info=json_path,
+    )
+    for name, json_path, seq in zip(_NAMES, _PATHS, _SEQS)
+    if name in BUILTIN_FIELDS
+)
 
 
 # ── Example Log (exercises all 44 field mappings) ────────────
@@ -257,37 +314,129 @@ EXAMPLE_LOG = {
     "labels": {"instanceId": "00a1b2c3d4e5f6"},
 }
 
+# Serialised once, with compact separators; the parser only needs valid JSON.
+EXAMPLE_CONTENT = json.dumps(EXAMPLE_LOG, separators=(",", ":"))
+
+
+def _assert_paths_resolve():
+    """Fail at import if a FIELD_MAPPINGS path is missing from EXAMPLE_LOG."""
+    missing = []
+    for json_path in _PATHS:
+        node = EXAMPLE_LOG
+        for key in json_path[2:].split("."):
+            if not isinstance(node, dict) or key not in node:
+                missing.append(json_path)
+                break
+            node = node[key]
+    if missing:
+        raise ValueError(f"EXAMPLE_LOG does not cover: {', '.join(missing)}")
+
+
+_assert_paths_resolve()
+
 
 # ── Field Creation ────────────────────────────────────────────
 
+# Field upserts are independent, blocking HTTPS calls, so they are
+# issued concurrently instead of one round-trip at a time.
+FIELD_WORKERS = int(os.environ.get("LA_FIELD_WORKERS", 16))
+
+# Cap on concurrent upserts, to stay under Log Analytics rate limits
+_upsert_slots = threading.Semaphore(int(os.environ.get("LA_MAX_INFLIGHT", 8)))
+
+# Throttling / transient statuses worth retrying
+RETRYABLE_STATUSES = (429, 500, 502, 503, 504)
+MAX_ATTEMPTS = 6
+
+
+def _call_with_backoff(fn, *args, **kwargs):
+    """Call an SDK operation, retrying throttling and 5xx errors.
+
+    Sleeps with capped exponential backoff plus jitter between attempts.
+    Other service errors (e.g. 409 Conflict) are raised immediately.
+    """
+    for attempt in range(MAX_ATTEMPTS):
+        try:
+            return fn(*args, **kwargs)
+        except oci.exceptions.ServiceError as exc:
+            if exc.status not in RETRYABLE_STATUSES or attempt == MAX_ATTEMPTS - 1:
+                raise
+            time.sleep(min(10.0, 0.5 * 2 ** attempt) + random.uniform(0, 0.1))
+
+
+def _upsert_one(client, namespace, display_name):
+    """Create or upsert a single custom field.
+
+    Returns a (display_name, internal_name, status) tuple; internal_name
+    is None if the upsert failed.
+    """
+    details = UpsertLogAnalyticsFieldDetails()
+    details.display_name = display_name
+    details.data_type = "String"
+    details.is_multi_valued = False
+    try:
+        with _upsert_slots:
+            resp = _call_with_backoff(client.upsert_field, namespace, details)
+        return (display_name, resp.data.name, "OK")
+    except oci.exceptions.ServiceError as exc:
+        # A non-retryable error may mean the field was created since the
+        # prefetch; create_fields re-reads the field list for those.
+        return (display_name, None, f"HTTP {exc.status}")
+
+
+def _existing_fields(client, namespace):
+    """Fetch all fields in the namespace once, as display_name -> name."""
+    try:
+        fields = oci.pagination.list_call_get_all_results(
+            client.list_fields, namespace
+        ).data
+    except oci.exceptions.ServiceError as exc:
+        print(f"  Field list unavailable (HTTP {exc.status}); upserting all")
+        return {}
+    return {f.display_name: f.name for f in fields}
+
+
 def create_fields(client, namespace):
     """Create or upsert all 40 custom fields.
 
     Returns a dict mapping display_name -> internal_name.
     """
+    existing = _existing_fields(client, namespace)
+    results = {
+        display_name: (existing[display_name], "EXISTS")
+        for display_name in FIELD_DISPLAY_NAMES
+        if display_name in existing
+    }
+
+    # Results are collected and printed as one table at the end, so
+    # concurrent workers never interleave their output.
+    with ThreadPoolExecutor(max_workers=FIELD_WORKERS) as ex:
+        futures = [
+            ex.submit(_upsert_one, client, namespace, display_name)
+            for display_name in FIELD_DISPLAY_NAMES
+            if display_name not in existing
+        ]
+        for future in as_completed(futures):
+            display_name, name, status = future.result()
+            results[display_name] = (name, status)
+
+    failed = [n for n, (name, _) in results.items() if name is None]
+    if failed:
+        existing = _existing_fields(client, namespace)
+        for display_name in failed:
+            if display_name in existing:
+                results[display_name] = (existing[display_name], "EXISTS")
+
+    rows = []
     field_map = {}
     for display_name in FIELD_DISPLAY_NAMES:
-        details = UpsertLogAnalyticsFieldDetails()
-        details.display_name = display_name
-        details.data_type = "String"
-        details.is_multi_valued = False
-        try:
-            resp = client.upsert_field(namespace, details)
-            field_map[display_name] = resp.data.name
-            print(f"  Field OK     {resp.data.name:12s} -> {display_name}")
-        except oci.exceptions.ServiceError:
-            # Field may already exist; look it up
-            try:
-                fields = client.list_fields(
-                    namespace, display_name_contains=display_name
-                ).data.items
-                for f in fields:
-                    if f.display_name == display_name:
-                        field_map[display_name] = f.name
-                        print(f"  Field EXISTS {f.name:12s} -> {display_name}")
-                        break
-            except Exception as exc:
-                print(f"  Field ERR: {display_name}: {exc}")
+        name, status = results[display_name]
+        if name is None:
+            rows.append(f"  Field ERR    {'-':12s} -> {display_name} ({status})")
+        else:
+            rows.append(f"  Field {status:6s} {name:12s} -> {display_name}")
+            field_map[display_name] = name
+    print("\n".join(rows))
     return field_map
 
 
@@ -296,22 +445,44 @@ def create_fields(client, namespace):
 PARSER_NAME = "gcpCloudLoggingJsonParser"
 
 
-def create_parser(client, namespace, field_map):
-    """Create or upsert the JSON parser with 44 field mappings."""
-    parser_field_maps = []
-    for name_or_display, json_path, seq in FIELD_MAPPINGS:
-        internal = field_map.get(name_or_display, name_or_display)
-        parser_field_maps.append(
-            LogAnalyticsParserField(
-                field=LogAnalyticsField(name=internal),
-                parser_field_name=internal,
-                parser_field_sequence=seq,
-                storage_field_name=internal,
-                structured_column_info=json_path,
-            )
+@functools.lru_cache(maxsize=4)
+def _parser_field_maps(field_items):
+    """Build the parser field mappings for a frozen field_map."""
+    field_map = dict(field_items)
+    resolved = [field_map.get(n, n) for n in _NAMES]
+    parser_field_maps = list(_STATIC_FIELDS)
+    parser_field_maps.extend(
+        LogAnalyticsParserField(
+            field=LogAnalyticsField(name=internal),
+            parser_field_name=internal,
+            parser_field_sequence=seq,
+            storage_field_name=internal,
+            structured_column_info=json_path,
         )
+        for name, internal, json_path, seq in zip(_NAMES, resolved, _PATHS, _SEQS)
+        if name not in BUILTIN_FIELDS
+    )
+    return tuple(parser_field_maps)
 
-    example_content = json.dumps(EXAMPLE_LOG, indent=2)
+
+def _safe_get_parser_etag(client, namespace):
+    """Return the existing parser's etag, or None if it does not exist yet."""
+    try:
+        existing = client.get_parser(namespace, PARSER_NAME)
+        return existing.headers.get("etag")
+    except oci.exceptions.ServiceError:
+        return None
+
+
+def create_parser(client, namespace, field_map, etag):
+    """Create or upsert the JSON parser with 44 field mappings.
+
+    *etag* is the existing parser's etag (optimistic concurrency), as
+    returned by _safe_get_parser_etag, or None to create it.
+    """
+    parser_field_maps = list(
+        _parser_field_maps(tuple(sorted(field_map.items())))
+    )
 
     parser_details = UpsertLogAnalyticsParserDetails(
         name=PARSER_NAME,
@@ -328,19 +499,11 @@ def create_parser(client, namespace, field_map):
         is_single_line_content=False,
         is_system=False,
         header_content="$:0",
-        content=example_content,
-        example_content=example_content,
+        content=EXAMPLE_CONTENT,
+        example_content=EXAMPLE_CONTENT,
         field_maps=parser_field_maps,
     )
 
-    # Get existing etag for update (optimistic concurrency)
-    etag = None
-    try:
-        existing = client.get_parser(namespace, PARSER_NAME)
-        etag = existing.headers.get("etag")
-    except oci.exceptions.ServiceError:
-        pass
-
     kwargs = {"if_match": etag} if etag else {}
     result = client.upsert_parser(namespace, parser_details, **kwargs)
     print(f"  Parser OK: {result.data.name} ({len(result.data.field_maps)} field maps)")
@@ -351,63 +514,50 @@ def create_parser(client, namespace, field_map):
 SOURCE_NAME = "GCP Cloud Logging Logs"
 
 
-def create_source(client, namespace, compartment_id):
-    """Create the Log Analytics source referencing the parser."""
-    # Check if source already exists
+def _existing_source_name(client, namespace, compartment_id):
+    """Return the name of the source if it already exists, else None."""
     try:
         existing = client.list_sources(
             namespace, compartment_id,
             name=SOURCE_NAME, is_system="ALL",
         )
         if existing.data.items:
-            print(f"  Source EXISTS: {existing.data.items[0].name}")
-            return
+            return existing.data.items[0].name
     except Exception:
         pass
+    return None
 
-    # Build source JSON for OCI CLI (SDK source upsert is complex)
-    import subprocess
-    import tempfile
-
-    parsers_json = json.dumps(
-        [{"name": PARSER_NAME, "isDefault": True}]
-    )
-    entity_types_json = json.dumps(
-        [{"entityType": "oci_generic_resource",
-          "entityTypeCategory": "Undefined",
-          "entityTypeDisplayName": "OCI Generic Resource"}]
-    )
 
-    with tempfile.NamedTemporaryFile(mode="w", suffix=".json", delete=False) as pf:
-        pf.write(parsers_json)
-        parsers_path = pf.name
-    with tempfile.NamedTemporaryFile(mode="w", suffix=".json", delete=False) as ef:
-        ef.write(entity_types_json)
-        entity_path = ef.name
+def create_source(client, namespace, existing_name):
+    """Create the Log Analytics source referencing the parser."""
+    if existing_name:
+        print(f"  Source EXISTS: {existing_name}")
+        return
 
+    details = UpsertLogAnalyticsSourceDetails(
+        name="gcpCloudLoggingSource",
+        display_name=SOURCE_NAME,
+        description=(
+            "GCP Cloud Logging structured logs from Pub/Sub via OCI Streaming"
+        ),
+        type_name="os_file",
+        is_system=False,
+        is_for_cloud=False,
+        parsers=[LogAnalyticsParser(name=PARSER_NAME, is_default=True)],
+        entity_types=[
+            LogAnalyticsSourceEntityType(
+                entity_type="oci_generic_resource",
+                entity_type_category="Undefined",
+                entity_type_display_name="OCI Generic Resource",
+            )
+        ],
+    )
     try:
-        cmd = [
-            "oci", "log-analytics", "source", "upsert-source",
-            "--namespace-name", namespace,
-            "--name", "gcpCloudLoggingSource",
-            "--display-name", SOURCE_NAME,
-            "--description",
-            "GCP Cloud Logging structured logs from Pub/Sub via OCI Streaming",
-            "--type-name", "os_file",
-            "--is-system", "false",
-            "--is-for-cloud", "false",
-            "--parsers", f"file://{parsers_path}",
-            "--entity-types", f"file://{entity_path}",
-        ]
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        if result.returncode == 0:
-            print(f"  Source created: {SOURCE_NAME}")
-        else:
-            print(f"  Source warning: {result.stderr[:200]}")
-            print("  Source may need manual creation via OCI Console or setup_oci.sh")
-    finally:
-        os.unlink(parsers_path)
-        os.unlink(entity_path)
+        client.upsert_source(namespace, details)
+        print(f"  Source created: {SOURCE_NAME}")
+    except oci.exceptions.ServiceError as exc:
+        print(f"  Source warning: HTTP {exc.status} {exc.code}: {exc.message}")
+        print("  Source may need manual creation via OCI Console or setup_oci.sh")
 
 
 # ── Main ──────────────────────────────────────────────────────
@@ -429,17 +579,25 @@ def main():
 
     client = get_client()
 
-    print("--- Creating custom fields (40) ---")
-    field_map = create_fields(client, namespace)
-    print(f"  Total: {len(field_map)} fields\n")
+    with ThreadPoolExecutor(max_workers=2) as preflight:
+        # The parser etag and source lookups are read-only and do not
+        # depend on the fields, so run them while the fields are created.
+        etag_future = preflight.submit(_safe_get_parser_etag, client, namespace)
+        source_future = preflight.submit(
+            _existing_source_name, client, namespace, compartment_id
+        )
 
-    print("--- Creating JSON parser (44 field mappings) ---")
-    create_parser(client, namespace, field_map)
-    print()
+        print("--- Creating custom fields (40) ---")
+        field_map = create_fields(client, namespace)
+        print(f"  Total: {len(field_map)} fields\n")
 
-    print("--- Creating Log Analytics source ---")
-    create_source(client, namespace, compartment_id)
-    print()
+        print("--- Creating JSON parser (44 field mappings) ---")
+        create_parser(client, namespace, field_map, etag_future.result())
+        print()
+
+        print("--- Creating Log Analytics source ---")
+        create_source(client, namespace, source_future.result())
+        print()
 
     print("Log Analytics custom content setup complete.")
 